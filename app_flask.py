@@ -1,41 +1,89 @@
-from flask import Flask, render_template, request, send_file, session, redirect, url_for
+from flask import Flask, render_template, request, send_file, send_from_directory, session, redirect, url_for
 import os
+import re
 import tempfile
-from llm_utils import generate_outline
+import functools
+import threading
+import time
+from llm_utils import generate_outline, get_llm_metrics
 #from ppt_generator import create_presentation, list_available_themes
-from flask import send_from_directory
 from ppt import create_presentation, list_available_themes, ensure_conclusion_slide
 
 
-app = Flask(__name__)
+# The static route is registered below so only static files get a long max-age
+app = Flask(__name__, static_folder=None)
 app.secret_key = 'your-secret-key-here'  
 
 
-def find_matching_image(theme_name):
+THEME_IMAGE_FOLDER = "static/images/themes"
+STATIC_MAX_AGE = 86400  # seconds
+NUMBERED_IMAGE_PATTERN = re.compile(r'^theme([1-9]\d*)\.(png|jpg)$')
+
+
+@functools.lru_cache(maxsize=1)
+def _scan_theme_images(mtime):
+    """
+    Snapshot the theme image folder.
+    Keyed by the folder mtime so adding/removing an image refreshes the cache.
+    Returns {"files": {filename: url}, "stems": [(lower_stem, url)], "numbered": {n: url}}
+    where "stems" lists the image files for partial matching and "numbered"
+    holds the themeN.png / themeN.jpg fallbacks (.png preferred).
+    """
+    files = {}
+    stems = []
+    numbered = {}
+    with os.scandir(THEME_IMAGE_FOLDER) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files[entry.name] = f"/{THEME_IMAGE_FOLDER}/{entry.name}"
+    
+    for name, url in files.items():
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+            stems.append((os.path.splitext(name)[0].lower(), url))
+        
+        match = NUMBERED_IMAGE_PATTERN.match(name)
+        if match and (match.group(2) == "png" or int(match.group(1)) not in numbered):
+            numbered[int(match.group(1))] = url
+    
+    return {"files": files, "stems": stems, "numbered": numbered}
+
+
+def get_theme_images():
+    """
+    Return the cached theme image snapshot, or None if the folder is missing
+    """
+    try:
+        mtime = os.stat(THEME_IMAGE_FOLDER).st_mtime_ns
+    except OSError:
+        return None
+    return _scan_theme_images(mtime)
+
+
+def find_matching_image(theme_name, snapshot=None):
     """
     Try to find a matching image for the theme
+    Pass a snapshot from get_theme_images() to avoid looking it up again.
     """
-    image_folder = "static/images/themes"
-    if not os.path.exists(image_folder):
+    if snapshot is None:
+        snapshot = get_theme_images()
+    if snapshot is None:
         return None
+    images = snapshot["files"]
     
     # Try exact match first
     possible_extensions = ['.png', '.jpg', '.jpeg', '.webp']
     for ext in possible_extensions:
-        image_path = f"{image_folder}/{theme_name}{ext}"
-        if os.path.exists(image_path):
-            return f"/{image_path}"
+        image_name = f"{theme_name}{ext}"
+        if image_name in images:
+            return images[image_name]
     
     # Try partial matches
-    images = os.listdir(image_folder)
     theme_lower = theme_name.lower()
     
-    for img in images:
-        if img.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-            img_name = os.path.splitext(img)[0].lower()
-            # Check if theme contains image name or vice versa
-            if img_name in theme_lower or theme_lower in img_name:
-                return f"/static/images/themes/{img}"
+    for img_name, image_url in snapshot["stems"]:
+        # Check if theme contains image name or vice versa
+        if img_name in theme_lower or theme_lower in img_name:
+            return image_url
     
     return None
 
@@ -43,26 +91,26 @@ def get_theme_image_url(theme_name, index=None):
     """
     Get image URL for theme with optional index
     """
+    # One snapshot serves both the name match and the numbered fallbacks
+    snapshot = get_theme_images()
+    if snapshot is None:
+        snapshot = {"files": {}, "stems": [], "numbered": {}}
+    
     # Try to find matching image
-    image_url = find_matching_image(theme_name)
+    image_url = find_matching_image(theme_name, snapshot)
     if image_url:
         return image_url
     
+    numbered = snapshot["numbered"]
+    
     # If index is provided, try that specific numbered image
-    if index is not None:
-        image_files = [f"theme{index+1}.png", f"theme{index+1}.jpg"]
-        for image_file in image_files:
-            image_path = f"static/images/themes/{image_file}"
-            if os.path.exists(image_path):
-                return f"/{image_path}"
-    
-    # Try all numbered images as fallback
-    for i in range(1, 20):
-        image_files = [f"theme{i}.png", f"theme{i}.jpg"]
-        for image_file in image_files:
-            image_path = f"static/images/themes/{image_file}"
-            if os.path.exists(image_path):
-                return f"/{image_path}"
+    if index is not None and index + 1 in numbered:
+        return numbered[index + 1]
+    
+    # Try the lowest numbered image as fallback
+    fallback = [i for i in numbered if 1 <= i < 20]
+    if fallback:
+        return numbered[min(fallback)]
     
     # Final fallback to placeholder
     return f"https://placehold.co/400x250/2563eb/white?text={theme_name.replace(' ', '+')}&font=montserrat"
@@ -70,6 +118,87 @@ def get_theme_image_url(theme_name, index=None):
 
 
 
+# Generated presentations live here until the session resets or they go stale
+PRESENTATION_DIR = os.path.join(tempfile.gettempdir(), "ai_presentations")
+PRESENTATION_MAX_AGE = 6 * 60 * 60  # seconds
+os.makedirs(PRESENTATION_DIR, exist_ok=True)
+
+
+def is_presentation_file(path):
+    """
+    True if path points inside PRESENTATION_DIR (the session cookie is client-supplied)
+    """
+    presentation_dir = os.path.realpath(PRESENTATION_DIR)
+    return os.path.commonpath([os.path.realpath(path), presentation_dir]) == presentation_dir
+
+
+def remove_presentation_file(path):
+    """
+    Delete a generated presentation if it is still on disk
+    """
+    if path and is_presentation_file(path) and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠️ Could not remove {path}: {e}")
+
+
+def cleanup_stale_presentations(max_age=PRESENTATION_MAX_AGE):
+    """
+    Delete generated presentations older than max_age seconds (abandoned sessions)
+    """
+    cutoff = time.time() - max_age
+    # The tmp reaper may have removed the folder since startup
+    os.makedirs(PRESENTATION_DIR, exist_ok=True)
+    with os.scandir(PRESENTATION_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                # Another worker already removed it
+                continue
+
+
+# Theme cards for step2, rebuilt only when the themes or theme image folders change
+_THEME_CACHE = {"mtime": None, "data": None}
+_THEME_CACHE_LOCK = threading.Lock()
+
+
+def _folder_mtime(folder):
+    try:
+        return os.stat(folder).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_theme_data(theme_folder="themes"):
+    """
+    Get the theme list with image URLs, reusing the cached copy while the folders are unchanged
+    """
+    mtime = (_folder_mtime(theme_folder), _folder_mtime(THEME_IMAGE_FOLDER))
+    
+    with _THEME_CACHE_LOCK:
+        if _THEME_CACHE["data"] is not None and _THEME_CACHE["mtime"] == mtime:
+            return _THEME_CACHE["data"]
+        
+        themes = list_available_themes(theme_folder)
+        theme_names = [os.path.splitext(theme)[0] for theme in themes]
+        
+        # Create theme data with image URLs
+        theme_data = []
+        for theme_name in theme_names:
+            theme_data.append({
+                'name': theme_name,
+                'image_url': get_theme_image_url(theme_name)
+            })
+        
+        # list_available_themes may have just created the folder, so re-read its mtime
+        _THEME_CACHE["mtime"] = (_folder_mtime(theme_folder), mtime[1])
+        _THEME_CACHE["data"] = theme_data
+        return theme_data
+
+
 @app.route('/')
 def index():
     return redirect(url_for('step1'))
@@ -98,22 +227,13 @@ def step2():
     
     theme_folder = "themes"
     try:
-        themes = list_available_themes(theme_folder)
-        theme_names = [os.path.splitext(theme)[0] for theme in themes]
+        theme_data = get_theme_data(theme_folder)
         
-        print(f"🎨 Available themes: {theme_names}")
+        print(f"🎨 Available themes: {[theme['name'] for theme in theme_data]}")
         
-        if not themes:
+        if not theme_data:
             return render_template('step2.html', error="No themes found in the themes folder")
         
-        # Create theme data with image URLs
-        theme_data = []
-        for theme_name in theme_names:
-            theme_data.append({
-                'name': theme_name,
-                'image_url': get_theme_image_url(theme_name)
-            })
-        
         if request.method == 'POST':
             theme = request.form.get('theme')
             if theme:
@@ -133,13 +253,6 @@ def step2():
 
 
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
-    return send_from_directory('static', filename)
-
-
-
-
 @app.route('/step3', methods=['GET', 'POST'])
 def step3():
     if 'topic' not in session or 'theme' not in session:
@@ -159,8 +272,13 @@ def step3():
             # Get the correct theme path
             theme_path = os.path.join("themes", f"{session['theme']}.pptx")
             
+            # Drop this session's previous file and any abandoned ones before writing a new one
+            remove_presentation_file(session.pop('presentation_path', None))
+            cleanup_stale_presentations()
+            
             # Create a temporary file for the presentation
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp_file:
+            os.makedirs(PRESENTATION_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx', dir=PRESENTATION_DIR) as tmp_file:
                 # Correct the function call by matching the signature
                 presentation_path = create_presentation(
                     outline, 
@@ -196,24 +314,48 @@ def step3():
 
 
 
+@app.route('/static/<path:filename>', endpoint='static')
+def serve_static(filename):
+    # Werkzeug already sends an ETag/Last-Modified and answers conditional requests with 304;
+    # max_age adds Cache-Control so browsers reuse theme thumbnails without revalidating
+    return send_from_directory('static', filename, max_age=STATIC_MAX_AGE)
+
+
+
+
 @app.route('/download')
 def download():
-    if 'presentation_path' not in session or not os.path.exists(session['presentation_path']):
+    if ('presentation_path' not in session or not is_presentation_file(session['presentation_path'])
+            or not os.path.exists(session['presentation_path'])):
         return "Presentation not found", 404
     
     presentation_title = session.get('presentation_title', 'presentation')
-    return send_file(
+    response = send_file(
         session['presentation_path'],
         as_attachment=True,
         download_name=f"{presentation_title.replace(' ', '_')}.pptx",
-        mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        max_age=0
     )
+    # /download is the same URL for every session and regeneration, so never reuse a stored copy
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+
+
+@app.route('/metrics')
+def metrics():
+    # Outline/response cache hit rates and Groq call timing, in Prometheus text format
+    lines = [f"aippt_{name} {value}" for name, value in get_llm_metrics().items()]
+    return app.response_class("\n".join(lines) + "\n", mimetype="text/plain")
 
 
 
 
 @app.route('/reset')
 def reset():
+    remove_presentation_file(session.get('presentation_path'))
     session.clear()
     return redirect(url_for('step1'))
 
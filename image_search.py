@@ -1,5 +1,8 @@
 import os
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 import json
 import tempfile
@@ -8,42 +11,63 @@ from pptx.enum.text import MSO_ANCHOR
 import random
 import re
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 
+# Shared HTTP session so Unsplash API and image CDN connections are kept alive and reused
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Max parallel Unsplash searches/downloads when filling a presentation
+IMAGE_SEARCH_WORKERS = 8
+
+@functools.lru_cache(maxsize=256)
+def _search_images_cached(query, count):
+    """
+    Query the Unsplash search API; raises on failure so errors are never cached
+    """
+    url = f"https://api.unsplash.com/search/photos"
+    params = {
+        "query": query,
+        "per_page": count,
+        "client_id": UNSPLASH_ACCESS_KEY
+    }
+    
+    response = _SESSION.get(url, params=params, timeout=30)
+    response.raise_for_status()
+    
+    data = response.json()
+    images = []
+    
+    for result in data.get("results", []):
+        images.append({
+            "id": result["id"],
+            "url": result["urls"]["regular"],
+            "description": result.get("description", result.get("alt_description", "")),
+            "download_url": result["urls"]["regular"]
+        })
+    
+    return tuple(images)
+
 def search_images(query, count=5):
     """
     Search for images using Unsplash API
+    Repeated (query, count) pairs are served from an in-memory cache.
     """
     if not UNSPLASH_ACCESS_KEY:
         print("❌ Unsplash access key not found. Please add UNSPLASH_ACCESS_KEY to your .env file.")
         return []
     
     try:
-        url = f"https://api.unsplash.com/search/photos"
-        params = {
-            "query": query,
-            "per_page": count,
-            "client_id": UNSPLASH_ACCESS_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        images = []
-        
-        for result in data.get("results", []):
-            images.append({
-                "id": result["id"],
-                "url": result["urls"]["regular"],
-                "description": result.get("description", result.get("alt_description", "")),
-                "download_url": result["urls"]["regular"]
-            })
-        
-        return images
+        return list(_search_images_cached(query, count))
     
     except Exception as e:
         print(f"❌ Error searching images: {e}")
@@ -54,11 +78,13 @@ def download_image(image_url, filename):
     Download an image from a URL
     """
     try:
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-        
-        with open(filename, 'wb') as f:
-            f.write(response.content)
+        # Stream the body to disk in chunks rather than holding the whole image in memory
+        with _SESSION.get(image_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            
+            with open(filename, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
         
         return True
     except Exception as e:
@@ -116,73 +142,106 @@ def create_image_slide(prs, image_path, title_text=""):
         print(f"❌ Error creating image slide: {e}")
         return None
 
-def get_relevant_image_queries(presentation_title, slide_title, content, is_detailed=False):
+# Tokenizer, word filters and per-slide query cap for image query generation
+# (each query is an Unsplash request, and the first hit is usually one of the top words)
+MAX_IMAGE_QUERIES = 3
+_WORD_RE = re.compile(r'\b[a-zA-Z]{4,}\b')
+
+_STOP_WORDS = frozenset({"the", "and", "or", "but", "in", "on", "at", "to", "for",
+                         "of", "with", "by", "that", "this", "these", "those", "is",
+                         "are", "was", "were", "be", "been", "being", "have", "has",
+                         "had", "do", "does", "did", "will", "would", "could", "should"})
+
+_ABSTRACT_TERMS = frozenset({"management", "strategy", "system", "process", "method",
+                             "approach", "concept", "theory", "principle", "framework",
+                             "model", "analysis", "development", "implementation"})
+
+def get_relevant_image_queries(presentation_title, slide_title, content, is_detailed=False, max_queries=MAX_IMAGE_QUERIES):
     """
     Generate relevant search queries for images based on presentation content
     For detailed presentations, use the entire LLM content
+    Queries are yielded lazily, best first, so callers that stop at the first
+    image found never build (or search) the rest.
     """
-    queries = []
-    
     if is_detailed:
         # For detailed presentations, use the entire content from LLM
-        content_text = " ".join([point["text"] for point in content])
+        content_text = " ".join(point["text"] for point in content)
         all_text = f"{presentation_title} {slide_title} {content_text}"
         
-        # Extract meaningful words (nouns, adjectives)
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', all_text.lower())
-        
-        # Remove common stop words
-        stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", 
-                     "of", "with", "by", "that", "this", "these", "those", "is",
-                     "are", "was", "were", "be", "been", "being", "have", "has",
-                     "had", "do", "does", "did", "will", "would", "could", "should"}
-        
-        meaningful_words = [word for word in words if word not in stop_words]
-        
-        # Get the most frequent words
-        word_counts = Counter(meaningful_words)
-        most_common = [word for word, count in word_counts.most_common(8)]
+        # Count meaningful words (nouns, adjectives), skipping common stop words
+        words = (match.group(0) for match in _WORD_RE.finditer(all_text.lower()))
+        word_counts = Counter(word for word in words if word not in _STOP_WORDS)
         
-        queries.extend(most_common)
-        
-        # Add combinations
-        for word in most_common[:3]:
-            queries.append(f"{presentation_title} {word}")
-            queries.append(f"{slide_title} {word}")
+        # Get the most frequent words, and the ones combined with titles
+        most_common = [word for word, count in word_counts.most_common(max_queries)]
+        num_combined = 3
     else:
         # For simple presentations, use a more targeted approach
-        content_text = " ".join([point["text"] for point in content])
+        content_text = " ".join(point["text"] for point in content)
         all_text = f"{slide_title} {content_text}"
         
-        # Find specific nouns (more likely to have good images)
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', all_text.lower())
-        
-        # Filter out abstract terms
-        abstract_terms = {"management", "strategy", "system", "process", "method", 
-                         "approach", "concept", "theory", "principle", "framework",
-                         "model", "analysis", "development", "implementation"}
-        
-        concrete_words = [word for word in words if word not in abstract_terms]
+        # Find specific nouns (more likely to have good images), filtering out abstract terms
+        words = (match.group(0) for match in _WORD_RE.finditer(all_text.lower()))
+        word_counts = Counter(word for word in words if word not in _ABSTRACT_TERMS)
         
         # Add the most frequent concrete words
-        word_counts = Counter(concrete_words)
-        most_common = [word for word, count in word_counts.most_common(5)]
-        
-        queries.extend(most_common)
-        
-        # Add combinations with presentation title for context
-        for word in most_common[:2]:
-            queries.append(f"{presentation_title} {word}")
-            queries.append(f"{slide_title} {word}")
+        most_common = [word for word, count in word_counts.most_common(max_queries)]
+        num_combined = 2
+    
+    def candidates():
+        yield from most_common
+        # Combinations with the titles for context; only reached when the content
+        # has fewer than max_queries distinct words
+        for word in most_common[:num_combined]:
+            yield f"{presentation_title} {word}"
+            yield f"{slide_title} {word}"
     
-    # Remove duplicates
-    queries = list(set(queries))
+    # Remove duplicates and stop once the cap is reached
+    seen = set()
+    for query in candidates():
+        if len(seen) >= max_queries:
+            return
+        if query in seen or not query.strip():
+            continue
+        seen.add(query)
+        yield query
     
     # If we don't have good queries, fall back to slide title
-    if not queries or not any(q.strip() for q in queries):
-        queries = [slide_title]
+    if not seen:
+        yield slide_title
+
+def find_image_for_slide(section, queries, temp_dir, num_images=3):
+    """
+    Try each query in order and download the first image found.
+    Returns (image_path, description) or None if nothing could be downloaded.
+    """
+    for query in queries:
+        print(f"🔎 Searching images for slide '{section}' with query: {query}")
+        images = search_images(query, num_images)
+        if images:
+            # Select the most relevant image
+            selected_image = images[0]
+            image_path = os.path.join(temp_dir, f"{section}_{selected_image['id']}.jpg")
+            
+            if download_image(selected_image['download_url'], image_path):
+                return image_path, selected_image['description']
     
-    return queries
+    return None
+
+def find_images_for_slides(slide_jobs, temp_dir, num_images=3):
+    """
+    Search and download images for several slides in parallel.
+    slide_jobs is a list of (section, queries); results are returned in the same order.
+    """
+    if not slide_jobs:
+        return []
+    
+    # The work is network-bound, so threads overlap the HTTP round trips
+    with ThreadPoolExecutor(max_workers=min(IMAGE_SEARCH_WORKERS, len(slide_jobs))) as executor:
+        return list(executor.map(
+            lambda job: find_image_for_slide(job[0], job[1], temp_dir, num_images),
+            slide_jobs
+        ))
 
 def add_images_to_presentation(prs, outline, presentation_title, detail_level, num_images=3):
     """
@@ -218,47 +277,41 @@ def add_images_to_presentation(prs, outline, presentation_title, detail_level, n
             # Create a list of outline sections with their indices
             outline_items = list(outline.items())
             
+            slide_jobs = []  # Store (insert_after_index, section, queries)
             for insert_after_index in insert_after_indices:
                 if insert_after_index < len(outline_items):
                     section, content = outline_items[insert_after_index]
                     if content:
                         queries = get_relevant_image_queries(presentation_title, section, content, is_detailed=True)
-                        
-                        print(f"🔎 Searching images for slide '{section}' with queries: {queries}")
-                        
-                        for query in queries:
-                            images = search_images(query, num_images)
-                            if images:
-                                # Select the most relevant image
-                                selected_image = images[0]
-                                image_path = os.path.join(temp_dir, f"{section}_{selected_image['id']}.jpg")
-                                
-                                if download_image(selected_image['download_url'], image_path):
-                                    image_slides_info.append((insert_after_index, image_path, f"Visual: {section}"))
-                                    print(f"✅ Found image for '{section}': {selected_image['description']}")
-                                    break
+                        slide_jobs.append((insert_after_index, section, queries))
+            
+            results = find_images_for_slides([(section, queries) for _, section, queries in slide_jobs], temp_dir, num_images)
             
-            # Create image slides and insert them in the correct positions
-            # We need to work backwards to maintain correct indices
-            image_slides_info.sort(reverse=True, key=lambda x: x[0])  # Sort by index in descending order
+            for (insert_after_index, section, _), result in zip(slide_jobs, results):
+                if result:
+                    image_path, description = result
+                    image_slides_info.append((insert_after_index, image_path, f"Visual: {section}"))
+                    print(f"✅ Found image for '{section}': {description}")
+            
+            # Create image slides (each is appended at the end initially)
+            content_slide_count = len(prs.slides)
+            image_slide_after = {}  # insert_after_index -> slide XML element
             
             for insert_after_index, image_path, title in image_slides_info:
-                # Create the image slide (this will be added at the end initially)
                 image_slide = create_image_slide(prs, image_path, title)
                 if image_slide:
                     print(f"🖼️ Created image slide for '{title}'")
-                    
-                    # Get the XML element of the newly created slide (last in the list)
-                    new_slide_xml = prs.slides._sldIdLst[-1]
-                    
-                    # Remove it from the end
-                    prs.slides._sldIdLst.remove(new_slide_xml)
-                    
-                    # Insert it at the correct position (after the specified slide)
-                    insert_position = insert_after_index + 1
-                    prs.slides._sldIdLst.insert(insert_position, new_slide_xml)
-                    
-                    print(f"📋 Inserted image slide at position {insert_position}")
+                    image_slide_after[insert_after_index] = prs.slides._sldIdLst[-1]
+            
+            # Reorder all slides in one pass, placing each image slide right after its content slide
+            slide_ids = prs.slides._sldIdLst
+            new_order = []
+            for index, slide_id in enumerate(slide_ids[:content_slide_count]):
+                new_order.append(slide_id)
+                if index in image_slide_after:
+                    new_order.append(image_slide_after[index])
+                    print(f"📋 Inserted image slide at position {len(new_order) - 1}")
+            slide_ids[:] = new_order
                 
         else:
             # For simple presentations: add smaller images to existing slides
@@ -286,24 +339,23 @@ def add_images_to_presentation(prs, outline, presentation_title, detail_level, n
                 
                 print(f"📊 Adding images to slides at indices: {selected_indices}")
                 
-                # Process each selected slide
-                for i, (section, content) in enumerate(outline.items()):
-                    if i in selected_indices and content:
+                # Collect queries for each selected slide
+                slide_jobs = []  # Store (slide_index, section, queries)
+                outline_items = list(outline.items())
+                for i in selected_indices:
+                    section, content = outline_items[i]
+                    if content:
                         queries = get_relevant_image_queries(presentation_title, section, content, is_detailed=False)
-                        
-                        print(f"🔎 Searching images for slide '{section}' with queries: {queries}")
-                        
-                        for query in queries:
-                            images = search_images(query, num_images)
-                            if images:
-                                # Select the most relevant image
-                                selected_image = images[0]
-                                image_path = os.path.join(temp_dir, f"{section}_{selected_image['id']}.jpg")
-                                
-                                if download_image(selected_image['download_url'], image_path):
-                                    slide = prs.slides[i]
-                                    add_image_to_slide(slide, image_path, "left_bottom", Inches(3))
-                                    print(f"✅ Added image to slide '{section}': {selected_image['description']}")
-                                    break
+                        slide_jobs.append((i, section, queries))
+                
+                results = find_images_for_slides([(section, queries) for _, section, queries in slide_jobs], temp_dir, num_images)
+                
+                # python-pptx is not thread-safe, so slides are edited back on this thread
+                for (i, section, _), result in zip(slide_jobs, results):
+                    if result:
+                        image_path, description = result
+                        slide = prs.slides[i]
+                        add_image_to_slide(slide, image_path, "left_bottom", Inches(3))
+                        print(f"✅ Added image to slide '{section}': {description}")
     
     return prs
\ No newline at end of file
@@ -1,25 +1,129 @@
 import os
 from dotenv import load_dotenv
-from groq import Groq
 import pprint
 import re
 import random
 import argparse
+import copy
+import functools
+import threading
+import time
+import hashlib
+import json
+import tempfile
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
 
 
-# Load environment variables
+# Load environment variables (GROQ_API_KEY is read when the client is created)
 load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+OUTLINE_MODEL = "llama-3.1-8b-instant"
+VALID_DETAIL_LEVELS = frozenset({"simple", "detailed"})
+
+# Raw Groq responses are cached on disk, keyed by a hash of the model, prompts and temperature
+LLM_CACHE_DIR = os.getenv("AIPPT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".aippt_cache"))
+LLM_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # seconds; older entries (memory or disk) count as misses and are deleted
+LLM_CACHE_FILE_SUFFIXES = (".txt", ".json", ".tmp")
+
+# Recently used responses are also kept in memory so repeats skip the disk read
+RESPONSE_CACHE_SIZE = 128
+_RESPONSE_CACHE = {}
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+# Cache and Groq call counters for tuning the caches (served by the Flask app at /metrics)
+LLM_METRICS = {
+    "response_cache_hits": 0,
+    "response_cache_misses": 0,
+    "outline_cache_hits": 0,
+    "outline_cache_misses": 0,
+    "groq_requests": 0,
+    "groq_failures": 0,
+    "groq_seconds": 0.0,
+}
+_LLM_METRICS_LOCK = threading.Lock()
+
+# Max concurrent Groq requests when generating outlines for several topics
+OUTLINE_BATCH_WORKERS = 8
+
+# Outlines generated from the Groq API, keyed by (topic signature, detail_level).
+# Also saved as JSON next to the raw responses so they survive a restart.
+# Mock fallbacks are never stored so a temporary API failure doesn't stick.
+OUTLINE_CACHE_SIZE = 64
+_OUTLINE_CACHE = {}
+_OUTLINE_CACHE_LOCK = threading.Lock()
+# Words that don't change what a presentation is about, ignored when matching cached topics
+TOPIC_FILLER_WORDS = frozenset({
+    "a", "an", "the", "and", "of", "in", "on", "for", "to", "with", "about",
+    "introduction", "intro", "overview", "basics", "basic", "fundamentals", "guide"
+})
+TOPIC_WORD_PATTERN = re.compile(r'\w+[+#]*')  # keeps "C++" and "C#" apart from "C"
+
+# Common patterns that indicate the actual topic follows, tried in order
+TOPIC_PATTERNS = (
+    re.compile(r'(?:about|on|regarding|concerning|related to|for)\s+([^\.\?\!]+)'),
+    re.compile(r'(?:presentation|ppt|slides|talk|speech)\s+(?:about|on|regarding)\s+([^\.\?\!]+)'),
+    re.compile(r'(?:give me|create|generate|make|build)\s+(?:a\s+)?(?:presentation|ppt|slides)\s+(?:about|on|regarding)?\s*([^\.\?\!]+)'),
+    re.compile(r'(?:i want|i need)\s+(?:a\s+)?(?:presentation|ppt|slides)\s+(?:about|on|regarding)?\s*([^\.\?\!]+)'),
+)
+LEADING_COMMAND_WORD_PATTERN = re.compile(r'^(?:about|on|regarding|for|a|the)\s+')
+
+# Command phrases stripped from free-form topic input, as one alternation so the
+# input is scanned once (longer phrases listed before the words they contain)
+COMMAND_PHRASES = [
+    'give me', 'can you', 'could you', 'please', 'create', 'generate',
+    'make', 'build', 'i want', 'i need', 'a presentation', 'a ppt',
+    'powerpoint', 'slides', 'presentation', 'about', 'on', 'regarding',
+    'for', 'the'
+]
+COMMAND_PHRASE_PATTERN = re.compile(r'\b(?:' + '|'.join(COMMAND_PHRASES) + r')\b')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+# ASCII-only equivalent of PUNCTUATION_PATTERN for str.translate (the common case)
+PUNCTUATION_TABLE = str.maketrans('', '', ''.join(
+    ch for ch in map(chr, range(128)) if not (ch.isalnum() or ch.isspace() or ch == '_')
+))
+
+# Markdown cleanup (clean_markdown) and bullet markers (process_bullet_points)
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+ITALIC_PATTERN = re.compile(r'\*(.*?)\*')
+HEADER_PATTERN = re.compile(r'#+\s*')
+LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+IMAGE_PATTERN = re.compile(r'!\[([^\]]+)\]\([^)]+\)')
+
+# LLM preamble phrases ("Here is your outline..."), skipped when looking for the presentation title
+INTRO_PHRASES = [
+    'here is', 'this is', 'below is', 'following is',
+    'presentation outline', 'outline for', 'generated outline',
+    'i have', 'i\'ve created', 'the following'
+]
+# (ASCII case folding matches the phrases exactly as lowercasing the line would, without the copy)
+INTRO_PHRASE_PATTERN = re.compile('|'.join(map(re.escape, INTRO_PHRASES)), re.IGNORECASE | re.ASCII)
+# Lines that could be the presentation title: a reasonable length (4-79 characters),
+# not a header, bullet or numbered item ("1."), and not a label or separator (ending ':' or '-')
+TITLE_CANDIDATE_PATTERN = re.compile(r'(?![#*\-•]|\d+\.).{4,79}(?<![:\-])', re.DOTALL)
+# Non-empty lines of LLM output, matched lazily instead of splitting into a list.
+# Breaks on the same characters as str.splitlines (\v, \f, \x1c-\x1e, \x85, \u2028, \u2029 too)
+LINE_PATTERN = re.compile(r'[^\r\n\v\f\x1c-\x1e\x85\u2028\u2029]+')
 
 def initialize_groq_client():
-    """Initialize and return the Groq client"""
-    if not GROQ_API_KEY:
+    """Initialize and return the Groq client (shared, so its connection pool is reused across calls)"""
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
         raise ValueError("❌ GROQ_API_KEY not found. Please add it to your .env file.")
     
-    client = Groq(api_key=GROQ_API_KEY)
+    return _create_groq_client(api_key)
+
+@functools.lru_cache(maxsize=1)
+def _create_groq_client(api_key):
+    # Imported here so parse-only users (and the mock fallback) don't pay for loading the SDK
+    from groq import Groq
+    
+    # The SDK's pooled httpx client (100 connections) already covers OUTLINE_BATCH_WORKERS
+    client = Groq(api_key=api_key)
     print("✅ Groq client initialized.")
     return client
 
+@functools.lru_cache(maxsize=256)
 def extract_topic_from_input(user_input):
     """
     Extract the main topic from user input more intelligently
@@ -30,42 +134,26 @@ def extract_topic_from_input(user_input):
     # Convert to lowercase for processing
     user_input = user_input.lower().strip()
     
-    # Common patterns that indicate the actual topic follows
-    topic_patterns = [
-        r'(?:about|on|regarding|concerning|related to|for)\s+([^\.\?\!]+)',
-        r'(?:presentation|ppt|slides|talk|speech)\s+(?:about|on|regarding)\s+([^\.\?\!]+)',
-        r'(?:give me|create|generate|make|build)\s+(?:a\s+)?(?:presentation|ppt|slides)\s+(?:about|on|regarding)?\s*([^\.\?\!]+)',
-        r'(?:i want|i need)\s+(?:a\s+)?(?:presentation|ppt|slides)\s+(?:about|on|regarding)?\s*([^\.\?\!]+)'
-    ]
-    
     # Try to extract topic using patterns
-    for pattern in topic_patterns:
-        match = re.search(pattern, user_input)
+    for pattern in TOPIC_PATTERNS:
+        match = pattern.search(user_input)
         if match:
             topic = match.group(1).strip()
             # Remove any remaining command words
-            topic = re.sub(r'^(?:about|on|regarding|for|a|the)\s+', '', topic)
+            topic = LEADING_COMMAND_WORD_PATTERN.sub('', topic)
             # Capitalize properly (title case)
             topic = ' '.join(word.capitalize() for word in topic.split())
             return topic if topic else "Artificial Intelligence"
     
     # Fallback: remove common command phrases and keep the rest
-    command_phrases = [
-        'give me', 'can you', 'could you', 'please', 'create', 'generate',
-        'make', 'build', 'i want', 'i need', 'a presentation', 'a ppt',
-        'powerpoint', 'slides', 'presentation', 'about', 'on', 'regarding',
-        'for', 'the'
-    ]
-    
-    cleaned = user_input
-    for phrase in command_phrases:
-        cleaned = re.sub(r'\b' + phrase + r'\b', '', cleaned)
+    cleaned = COMMAND_PHRASE_PATTERN.sub('', user_input)
     
     # Clean up and capitalize
-    cleaned = re.sub(r'[^\w\s]', '', cleaned)
-    cleaned = cleaned.strip()
-    if cleaned:
-        cleaned = ' '.join(word.capitalize() for word in cleaned.split())
+    if cleaned.isascii():
+        cleaned = cleaned.translate(PUNCTUATION_TABLE)
+    else:
+        cleaned = PUNCTUATION_PATTERN.sub('', cleaned)
+    cleaned = ' '.join(word.capitalize() for word in cleaned.split())
     
     return cleaned if cleaned else "Artificial Intelligence"
 
@@ -80,26 +168,149 @@ def get_user_preferences():
         if not detail_level:
             detail_level = "simple"
             break
-        if detail_level in ["simple", "detailed"]:
+        if detail_level in VALID_DETAIL_LEVELS:
             break
         print("Please enter 'simple' or 'detailed'")
     
     return topic, detail_level
 
 
-def get_presentation_outline(client, topic: str, detail_level: str = "simple") -> str:
+def record_metric(name, amount=1):
+    """Add amount to one of the LLM_METRICS counters"""
+    with _LLM_METRICS_LOCK:
+        LLM_METRICS[name] += amount
+
+def get_llm_metrics():
+    """Return a snapshot of the LLM_METRICS counters"""
+    with _LLM_METRICS_LOCK:
+        return dict(LLM_METRICS)
+
+
+# Set OUTLINE_CACHE_DISABLE=1 (or "true") to skip the response and outline caches entirely
+def llm_cache_enabled():
+    """False when OUTLINE_CACHE_DISABLE is set to 1/true, so every request goes to Groq"""
+    return os.getenv("OUTLINE_CACHE_DISABLE", "").strip().lower() not in ("1", "true")
+
+def cache_entry_expired(stored_at):
+    """True if a cache entry written at stored_at (a time.time() value) is older than LLM_CACHE_MAX_AGE"""
+    return time.time() - stored_at > LLM_CACHE_MAX_AGE
+
+def get_llm_cache_key(model, system_prompt, prompt, temperature):
+    """Build the response cache key for a Groq request"""
+    payload = json.dumps([model, system_prompt, prompt, temperature])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _remember_response(cache_key, response_text, stored_at):
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE.pop(cache_key, None)
+        _RESPONSE_CACHE[cache_key] = (stored_at, response_text)
+        if len(_RESPONSE_CACHE) > RESPONSE_CACHE_SIZE:
+            # Drop the oldest entry (dicts keep insertion order)
+            _RESPONSE_CACHE.pop(next(iter(_RESPONSE_CACHE)))
+
+def read_cached_response(cache_key):
+    """Return a cached Groq response from memory or disk, or None on a cache miss"""
+    with _RESPONSE_CACHE_LOCK:
+        cached = _RESPONSE_CACHE.get(cache_key)
+        if cached is not None and cache_entry_expired(cached[0]):
+            del _RESPONSE_CACHE[cache_key]
+            cached = None
+    if cached is not None:
+        return cached[1]
+    
+    cached = read_cache_file(f"{cache_key}.txt")
+    if cached is None:
+        return None
+    
+    response_text, stored_at = cached
+    _remember_response(cache_key, response_text, stored_at)
+    return response_text
+
+def remove_cache_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Already removed (e.g. by another worker)
+
+def read_cache_file(filename):
     """
-    Generate a presentation outline using Groq LLM with a generated title and specific constraints.
+    Return (text, mtime) for a file in LLM_CACHE_DIR, or None if it is missing.
+    A file older than LLM_CACHE_MAX_AGE is deleted and also counts as missing.
     """
-    system_prompt = (
-        "You are an expert presentation assistant. Your task is to create a professional presentation outline. "
-        "Strictly adhere to the user's formatting and content constraints, including bullet point and sentence length. "
-        "Each slide should be concise and focused on a single idea. Use markdown headers for slide titles."
-    )
+    path = os.path.join(LLM_CACHE_DIR, filename)
+    try:
+        stored_at = os.stat(path).st_mtime
+        if cache_entry_expired(stored_at):
+            remove_cache_file(path)
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read(), stored_at
+    except OSError:
+        return None
 
-    if detail_level == "simple":
-        prompt = f"""
-        Generate a concise, professional presentation outline about **{topic}**. The presentation should have 10-12 slides. Adhere to the following strict formatting rules:
+def prune_cache_dir():
+    """Delete cache files older than LLM_CACHE_MAX_AGE, so entries that are never requested again don't pile up"""
+    try:
+        with os.scandir(LLM_CACHE_DIR) as entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(LLM_CACHE_FILE_SUFFIXES) and cache_entry_expired(entry.stat().st_mtime):
+                        remove_cache_file(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+
+def write_cache_file(filename, text):
+    """Write a file into LLM_CACHE_DIR under a temp name and rename it, so readers never see a partial file"""
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=LLM_CACHE_DIR, suffix=".tmp", delete=False, encoding="utf-8") as tmp_file:
+            tmp_file.write(text)
+        os.replace(tmp_file.name, os.path.join(LLM_CACHE_DIR, filename))
+    except OSError as e:
+        print(f"⚠️ Could not write cache file {filename}: {e}")
+    # Writes follow a Groq call, so the directory scan is negligible next to the request
+    prune_cache_dir()
+
+def write_cached_response(cache_key, response_text):
+    """Store a Groq response in memory and on disk"""
+    _remember_response(cache_key, response_text, time.time())
+    write_cache_file(f"{cache_key}.txt", response_text)
+
+def clear_cache():
+    """Delete all cached Groq responses and outlines"""
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE.clear()
+    with _OUTLINE_CACHE_LOCK:
+        _OUTLINE_CACHE.clear()
+    if not os.path.isdir(LLM_CACHE_DIR):
+        return
+    for name in os.listdir(LLM_CACHE_DIR):
+        if name.endswith(LLM_CACHE_FILE_SUFFIXES):
+            os.remove(os.path.join(LLM_CACHE_DIR, name))
+
+
+def canonicalize_prompt(text):
+    """
+    Normalize prompt whitespace (common indentation, trailing spaces, line endings) so
+    equivalent prompts are byte-for-byte identical for response and prefix caching
+    """
+    lines = [line.rstrip() for line in text.splitlines()]
+    return textwrap.dedent("\n".join(lines)).strip() + "\n"
+
+
+# Prompts for get_presentation_outline. The system prompt and outline rules are fixed
+# text; only OUTLINE_TOPIC_SUFFIX varies and it comes last, so every request of a detail
+# level shares the same prefix for Groq's automatic prompt caching
+OUTLINE_SYSTEM_PROMPT = canonicalize_prompt(
+    "You are an expert presentation assistant. Your task is to create a professional presentation outline. "
+    "Strictly adhere to the user's formatting and content constraints, including bullet point and sentence length. "
+    "Each slide should be concise and focused on a single idea. Use markdown headers for slide titles."
+)
+
+SIMPLE_OUTLINE_PROMPT = canonicalize_prompt("""
+        Generate a concise, professional presentation outline about the topic given at the end. The presentation should have 10-12 slides. Adhere to the following strict formatting rules:
         
         1. The first slide is "**Introduction**". It must have 2-3 full sentences of introductory text, not bullet points.
         2. Each subsequent slide title must be on its own line surrounded by double asterisks: **Slide Title**
@@ -126,14 +337,10 @@ def get_presentation_outline(client, topic: str, detail_level: str = "simple") -
 
         **Conclusion**
         • Summary point 
+        """)
 
-        Now generate the outline for: {topic}
-        """
-    
-    else:  # detailed
-        # In get_presentation_outline function, update the prompt:
-        prompt = f"""
-        Generate a comprehensive, professional presentation outline about **{topic}**. 
+DETAILED_OUTLINE_PROMPT = canonicalize_prompt("""
+        Generate a comprehensive, professional presentation outline about the topic given at the end. 
 
         STRICT FORMATTING RULES:
         1. The first slide must be "**Introduction**" with 3-5 full sentences (no bullet points)
@@ -157,22 +364,94 @@ def get_presentation_outline(client, topic: str, detail_level: str = "simple") -
 
         **Conclusion**
         • Summary of key takeaways
+        """)
 
-        Now generate the outline for: {topic}"""
+# The only per-request text, appended after the static rules and example
+OUTLINE_TOPIC_SUFFIX = "\nNow generate the outline for: {topic}\n"
 
+
+def stream_presentation_outline(client, topic: str, detail_level: str = "simple", use_response_cache=True):
+    """
+    Yield the presentation outline text in chunks as Groq generates it.
+    A cached response is yielded as a single chunk; a fresh one is written to the
+    cache once the stream has been fully consumed.
+    Callers with their own cache (generate_outline's outline cache) pass
+    use_response_cache=False so the same result isn't stored twice.
+    """
+    system_prompt = OUTLINE_SYSTEM_PROMPT
+    topic = " ".join(topic.split())  # Same canonical whitespace as the templates
+
+    if detail_level == "simple":
+        prompt = SIMPLE_OUTLINE_PROMPT + OUTLINE_TOPIC_SUFFIX.format(topic=topic)
+    else:  # detailed
+        prompt = DETAILED_OUTLINE_PROMPT + OUTLINE_TOPIC_SUFFIX.format(topic=topic)
+
+    # Sampling is disabled in deterministic mode so a cached response is what the model would return anyway
+    temperature = 0.0 if os.getenv("AIPPT_DETERMINISTIC") else 0.7
+
+    # Identical requests are answered from the response cache
+    use_cache = use_response_cache and llm_cache_enabled()
+    cache_key = get_llm_cache_key(OUTLINE_MODEL, system_prompt, prompt, temperature)
+    if use_cache:
+        cached_response = read_cached_response(cache_key)
+        if cached_response is not None:
+            print("♻️ Using cached Groq response.")
+            record_metric("response_cache_hits")
+            yield cached_response
+            return
+        record_metric("response_cache_misses")
+
+    chunks = []
+    record_metric("groq_requests")
+    started = time.perf_counter()
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
+        stream = client.chat.completions.create(
+            model=OUTLINE_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
-            timeout=45
+            temperature=temperature,
+            timeout=45,
+            stream=True
         )
-        return response.choices[0].message.content
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                yield delta
     except Exception as e:
+        record_metric("groq_failures")
         raise Exception(f"❌ Failed to generate outline: {str(e)}")
+    finally:
+        record_metric("groq_seconds", time.perf_counter() - started)
+    
+    if use_cache:
+        write_cached_response(cache_key, "".join(chunks))
+
+
+def get_presentation_outline(client, topic: str, detail_level: str = "simple") -> str:
+    """
+    Generate a presentation outline using Groq LLM with a generated title and specific constraints.
+    The response is streamed, so the request isn't bound by a single long read.
+    """
+    return "".join(stream_presentation_outline(client, topic, detail_level))
+
+def strip_bullet_prefix(text):
+    """
+    Remove a leading bullet symbol and/or number ("- ", "1. ", "- 2) ") from a line.
+    Plain string checks instead of a regex, since this runs on every bullet.
+    """
+    if text and text[0] in '•-*' and text[1:2].isspace():
+        text = text[1:].lstrip()
+    
+    digits = 0
+    while digits < len(text) and text[digits].isdecimal():
+        digits += 1
+    if digits and text[digits:digits + 1] in ('.', ')') and text[digits + 1:digits + 2].isspace():
+        text = text[digits + 1:].lstrip()
+    
+    return text
 
 def process_bullet_points(content_lines):
     """
@@ -181,24 +460,24 @@ def process_bullet_points(content_lines):
     bullets = []
     
     for line in content_lines:
-        if not line.strip():
+        stripped = line.lstrip()
+        if not stripped:
             continue
             
         # Detect indentation level (2 spaces = 1 level)
-        leading_spaces = len(line) - len(line.lstrip())
+        leading_spaces = len(line) - len(stripped)
         level = leading_spaces // 2  # 2 spaces per level
         
         # Clean the line from markdown and bullet indicators
-        cleaned = clean_markdown(line.strip())
+        cleaned = clean_markdown(stripped)  # also trims trailing whitespace
         
         # Remove bullet indicators (•, -, *, numbered)
-        cleaned = re.sub(r'^[•\-*]\s+', '', cleaned)  # Remove bullet symbols
-        cleaned = re.sub(r'^\d+[\.\)]\s+', '', cleaned)  # Remove numbered bullets
+        cleaned = strip_bullet_prefix(cleaned)
         
         if cleaned:  # Only add non-empty content
             bullets.append({
                 "text": cleaned,
-                "level": max(0, min(level, 3))  # Limit levels to 0-3
+                "level": min(level, 3)  # Limit levels to 0-3
             })
     
     return bullets
@@ -210,79 +489,107 @@ def clean_markdown(text):
     if not text:
         return text
     
+    # Each pass only runs if its marker character is present; most bullet
+    # lines are plain text and skip straight to the whitespace cleanup
+    
     # Remove bold/italic but preserve for title detection
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)      # Remove *italic*
+    if '*' in text:
+        text = BOLD_PATTERN.sub(r'\1', text)    # Remove **bold**
+        text = ITALIC_PATTERN.sub(r'\1', text)  # Remove *italic*
     
     # Remove other markdown elements
-    text = re.sub(r'#+\s*', '', text)  # Remove headers
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)  # Remove links
-    text = re.sub(r'!\[([^\]]+)\]\([^)]+\)', '', text)  # Remove images
+    if '#' in text:
+        # Usual case is a leading "## " marker, which string methods handle without the regex
+        unmarked = text.lstrip('#')
+        if '#' not in unmarked:
+            text = unmarked.lstrip()
+        else:
+            text = HEADER_PATTERN.sub('', text)  # Remove headers
+    if '[' in text:
+        text = LINK_PATTERN.sub(r'\1', text)    # Remove links
+        text = IMAGE_PATTERN.sub('', text)       # Remove images
     
-    # Clean up extra spaces
-    text = re.sub(r'\s+', ' ', text).strip()
+    # Clean up extra spaces (split() also drops leading/trailing whitespace, so no strip() needed)
+    text = ' '.join(text.split())
     
     return text
+
+def get_slide_title(line):
+    """
+    Return the slide title if a stripped line is a **Title** or # Title marker, else None.
+    Plain string checks instead of a regex, since this runs on every line of the outline.
+    """
+    if line.startswith('**'):
+        inner = line[2:-2]
+        if len(line) > 4 and line.endswith('**') and '*' not in inner:
+            return inner.strip()
+    elif line.startswith('#'):
+        rest = line[1:]
+        if rest[:1].isspace() and '#' not in rest:
+            return rest.strip()
+    return None
+
+
+def iter_stream_lines(chunks):
+    """
+    Turn streamed text chunks into lines, yielding each line as soon as it is complete
+    """
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        pending = ""
+        for line_match in LINE_PATTERN.finditer(text):
+            if line_match.end() == len(text):
+                # No line break after it yet, so the line may continue in the next chunk
+                pending = line_match.group()
+            else:
+                yield line_match.group()
+    if pending:
+        yield pending
+
+
 def parse_llm_output_to_outline(llm_output: str):
     """
     Parse LLM output with strict slide boundary detection based on **Title** markers
     """
+    return parse_outline_lines(line_match.group() for line_match in LINE_PATTERN.finditer(llm_output))
+
+
+def parse_outline_lines(lines):
+    """
+    Parse an iterable of outline lines; a generator (e.g. iter_stream_lines) is
+    consumed as it produces, so parsing can overlap with a streamed response
+    """
     outline = {}
     current_slide = None
     slide_content = []
     main_title = None
+    intro_key = None  # First slide whose title mentions "introduction"
     
-    # Pattern to detect slide titles: both **Title** and # Title formats
-    slide_pattern = r'^\s*(?:\*\*([^*]+)\*\*|#\s+([^#]+))$'
-    
-    lines = llm_output.splitlines()
-    
-    # First, try to find the actual presentation title by skipping LLM's intro phrases
-    intro_phrases = [
-        'here is', 'this is', 'below is', 'following is',
-        'presentation outline', 'outline for', 'generated outline',
-        'i have', 'i\'ve created', 'the following'
-    ]
-    
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-        
-        line_lower = line.lower()
-        
-        # Skip LLM's introductory phrases
-        if any(phrase in line_lower for phrase in intro_phrases):
-            continue
-            
-        # Look for the first meaningful line that could be a title
-        if (len(line) > 3 and len(line) < 80 and  # Reasonable title length
-            not line.startswith(('#', '*', '-', '•', '1.', '2.', '3.')) and  # Not a bullet, header, or number
-            not line.endswith((':', '-')) and  # Not a label or separator
-            not re.match(r'^\d+\.', line) and  # Not a numbered list
-            not re.match(r'^[•\-*]', line)):  # Not a bullet point
-            
-            # Clean the line and use as main title
-            main_title = clean_markdown(line)
-            break
-    
-    # Now parse the slides
-    for i, line in enumerate(lines):
+    # Single pass: pick up the main title candidate and the slides together
+    for line in lines:
         line = line.strip()
         if not line:
             continue
         
         # Check if this is a slide title (either **Title** or # Title)
-        title_match = re.match(slide_pattern, line)
+        slide_title = get_slide_title(line)
         
-        if title_match:
-            # Extract title from either capture group
-            slide_title = title_match.group(1) or title_match.group(2)
-            slide_title = slide_title.strip()
-            
+        if main_title is None and slide_title is None:
+            # Look for the first meaningful line that could be a title,
+            # skipping LLM's introductory phrases
+            if (TITLE_CANDIDATE_PATTERN.fullmatch(line) and
+                not INTRO_PHRASE_PATTERN.search(line)):
+                
+                # Clean the line and use as main title
+                main_title = clean_markdown(line)
+        
+        if slide_title is not None:
             # Save previous slide content if exists
             if current_slide and slide_content:
-                outline[current_slide] = process_bullet_points(slide_content)
+                outline.setdefault(current_slide, []).extend(process_bullet_points(slide_content))
+                if intro_key is None and "introduction" in current_slide.lower():
+                    intro_key = current_slide
             
             # Start new slide
             current_slide = slide_title
@@ -295,116 +602,218 @@ def parse_llm_output_to_outline(llm_output: str):
     
     # Add the final slide
     if current_slide and slide_content:
-        outline[current_slide] = process_bullet_points(slide_content)
+        outline.setdefault(current_slide, []).extend(process_bullet_points(slide_content))
+        if intro_key is None and "introduction" in current_slide.lower():
+            intro_key = current_slide
     
     # If no main title found, use the first slide title or user topic
     if not main_title:
         if outline:
             # Use the first non-introduction slide title
-            for slide_title in outline.keys():
+            for slide_title in outline:
                 if "introduction" not in slide_title.lower():
                     main_title = slide_title
                     break
             # If all slides are introduction-like, use the first one
             if not main_title:
-                main_title = next(iter(outline.keys()))
+                main_title = next(iter(outline))
         else:
             main_title = "Presentation"
     
-    # Ensure Introduction slide exists and is first
-    if "Introduction" not in outline and any("introduction" in key.lower() for key in outline.keys()):
-        # Rename existing introduction-like slide
-        for key in list(outline.keys()):
-            if "introduction" in key.lower():
-                outline["Introduction"] = outline.pop(key)
-                break
-    
-    # Reorder to ensure Introduction is first if it exists
-    if "Introduction" in outline:
-        ordered_outline = {"Introduction": outline["Introduction"]}
-        for key, value in outline.items():
-            if key != "Introduction":
-                ordered_outline[key] = value
-        outline = ordered_outline
+    # Ensure Introduction slide exists and is first, renaming an introduction-like slide if needed
+    if "Introduction" not in outline and intro_key is not None:
+        outline["Introduction"] = outline.pop(intro_key)
+    
+    # The model is told to start with Introduction, so the rebuild is usually skipped
+    if "Introduction" in outline and next(iter(outline)) != "Introduction":
+        outline = {"Introduction": outline.pop("Introduction"), **outline}
     
     return main_title, outline
 
 
+@functools.lru_cache(maxsize=256)
+def _parse_llm_output_cached(llm_output):
+    return parse_llm_output_to_outline(llm_output)
+
+
+def parse_llm_output_cached(llm_output):
+    """
+    parse_llm_output_to_outline, memoized on the raw LLM text (e.g. repeated mock outlines).
+    Returns a copy of the cached outline so callers are free to modify it.
+    """
+    main_title, outline = _parse_llm_output_cached(llm_output)
+    return main_title, copy.deepcopy(outline)
+
+
+# Mock outline sections (first and last are Introduction/Conclusion)
+MOCK_SIMPLE_SECTIONS = (
+    "Introduction",
+    "Core Concepts",
+    "Key Features", 
+    "Applications",
+    "Benefits",
+    "Implementation",
+    "Case Studies",
+    "Best Practices",
+    "Future Trends",
+    "Conclusion"
+)
+MOCK_DETAILED_SECTIONS = (
+    "Introduction",
+    "Historical Background",
+    "Fundamental Principles",
+    "Technical Architecture", 
+    "Key Components",
+    "Implementation Methods",
+    "Industry Applications",
+    "Success Stories",
+    "Benefits and Advantages",
+    "Challenges and Limitations",
+    "Future Developments",
+    "Best Practices",
+    "Case Study Analysis",
+    "Conclusion and Recommendations"
+)
+
+# The middle sections don't depend on the topic, so their text is built once at import
+MOCK_SIMPLE_BODY = "".join(
+    f"**{section}**\n"
+    f"- Key point 1 about {section.lower()}\n- Key point 2 about {section.lower()}\n- Key point 3 about {section.lower()}\n\n"
+    for section in MOCK_SIMPLE_SECTIONS[1:-1]
+)
+MOCK_DETAILED_BODY = "".join(
+    f"**{section}**\n"
+    f"- In-depth analysis of first aspect of {section.lower()}\n"
+    "- Detailed examination of second aspect with specific examples\n"
+    "- Comprehensive review of third aspect including practical implications\n\n"
+    for section in MOCK_DETAILED_SECTIONS[1:-1]
+)
+
+
 # used when Groq API is unavailable
+@functools.lru_cache(maxsize=64)
 def get_mock_outline(topic, detail_level):
     """Return a mock outline for testing when API is unavailable"""
     if detail_level == "simple":
         # Simple presentation with 7-12 slides worth of content
-        title = f"**{topic}**"
-        sections = [
-            "Introduction",
-            "Core Concepts",
-            "Key Features", 
-            "Applications",
-            "Benefits",
-            "Implementation",
-            "Case Studies",
-            "Best Practices",
-            "Future Trends",
-            "Conclusion"
-        ]
-        
-        content = f"{title}\n\n"
-        content += f"**{sections[0]}**\n"
-        content += f"- Brief overview of {topic} and its significance\n- Main objectives and goals\n- Target audience and use cases\n\n"
-        
-        for i, section in enumerate(sections[1:-1], 1):
-            content += f"**{section}**\n"
-            content += f"- Key point 1 about {section.lower()}\n- Key point 2 about {section.lower()}\n- Key point 3 about {section.lower()}\n\n"
-        
-        content += f"**{sections[-1]}**\n"
-        content += "- Summary of main points\n- Key takeaways\n- Next steps and recommendations"
-        
-        return content
+        sections = MOCK_SIMPLE_SECTIONS
+        return "".join((
+            f"**{topic}**\n\n",
+            f"**{sections[0]}**\n",
+            f"- Brief overview of {topic} and its significance\n- Main objectives and goals\n- Target audience and use cases\n\n",
+            MOCK_SIMPLE_BODY,
+            f"**{sections[-1]}**\n",
+            "- Summary of main points\n- Key takeaways\n- Next steps and recommendations"
+        ))
         
     else:
         # Detailed presentation with 10-15 slides worth of content
-        title = f"**Comprehensive Analysis of {topic}**"
-        sections = [
-            "Introduction",
-            "Historical Background",
-            "Fundamental Principles",
-            "Technical Architecture", 
-            "Key Components",
-            "Implementation Methods",
-            "Industry Applications",
-            "Success Stories",
-            "Benefits and Advantages",
-            "Challenges and Limitations",
-            "Future Developments",
-            "Best Practices",
-            "Case Study Analysis",
-            "Conclusion and Recommendations"
-        ]
-        
-        content = f"{title}\n\n"
-        content += f"**{sections[0]}**\n"
-        content += f"- Comprehensive overview of {topic} and its significance in modern context\n"
-        content += f"- Detailed explanation of core concepts and their interrelationships\n"
-        content += f"- Discussion of the evolution and current state of {topic}\n\n"
-        
-        for i, section in enumerate(sections[1:-1], 1):
-            content += f"**{section}**\n"
-            content += f"- In-depth analysis of first aspect of {section.lower()}\n"
-            content += f"- Detailed examination of second aspect with specific examples\n"
-            content += f"- Comprehensive review of third aspect including practical implications\n\n"
-        
-        content += f"**{sections[-1]}**\n"
-        content += "- Detailed summary of all key insights and findings\n"
-        content += "- Specific recommendations for implementation and adoption\n"
-        content += "- Future outlook and potential developments in the field"
-        
-        return content
+        sections = MOCK_DETAILED_SECTIONS
+        return "".join((
+            f"**Comprehensive Analysis of {topic}**\n\n",
+            f"**{sections[0]}**\n",
+            f"- Comprehensive overview of {topic} and its significance in modern context\n",
+            "- Detailed explanation of core concepts and their interrelationships\n",
+            f"- Discussion of the evolution and current state of {topic}\n\n",
+            MOCK_DETAILED_BODY,
+            f"**{sections[-1]}**\n",
+            "- Detailed summary of all key insights and findings\n",
+            "- Specific recommendations for implementation and adoption\n",
+            "- Future outlook and potential developments in the field"
+        ))
+
+
+
+def get_topic_signature(topic):
+    """
+    Reduce a topic to its content words, lowercased and in their original order, so
+    near-duplicate phrasings ("AI in Healthcare", "ai healthcare", "Healthcare AI basics"
+    vs "Healthcare AI") share a cache entry. Order is kept because "China in Africa"
+    and "Africa in China" are different presentations.
+    """
+    words = TOPIC_WORD_PATTERN.findall(topic.casefold())
+    content_words = [word for word in words if word not in TOPIC_FILLER_WORDS]
+    return " ".join(content_words) if content_words else " ".join(words)
+
+def get_outline_cache_file(cache_key):
+    """File name of the on-disk copy of an outline cache entry"""
+    signature, detail_level = cache_key
+    digest = hashlib.sha256(f"{detail_level}|{signature}".encode("utf-8")).hexdigest()
+    return f"outline-{digest}.json"
+
+def _remember_outline(cache_key, outline_dict, presentation_title, stored_at):
+    with _OUTLINE_CACHE_LOCK:
+        _OUTLINE_CACHE.pop(cache_key, None)
+        _OUTLINE_CACHE[cache_key] = (stored_at, outline_dict, presentation_title)
+        if len(_OUTLINE_CACHE) > OUTLINE_CACHE_SIZE:
+            del _OUTLINE_CACHE[next(iter(_OUTLINE_CACHE))]
+
+def get_cached_outline(topic, detail_level):
+    """
+    Return a copy of a previously generated (outline, title) for this topic, or None.
+    Checks memory first, then the copy saved on disk by an earlier run.
+    Copies are handed out because callers (e.g. ensure_conclusion_slide) modify the outline.
+    """
+    cache_key = (get_topic_signature(topic), detail_level)
+    with _OUTLINE_CACHE_LOCK:
+        cached = _OUTLINE_CACHE.get(cache_key)
+        if cached is not None and cache_entry_expired(cached[0]):
+            del _OUTLINE_CACHE[cache_key]
+            cached = None
+    
+    if cached is None:
+        cached_file = read_cache_file(get_outline_cache_file(cache_key))
+        try:
+            cached_text, stored_at = cached_file
+            data = json.loads(cached_text)
+            cached = (stored_at, data["outline"], data["title"])
+        except (TypeError, ValueError, KeyError):
+            record_metric("outline_cache_misses")
+            return None
+        _remember_outline(cache_key, cached[1], cached[2], stored_at)
+    
+    record_metric("outline_cache_hits")
+    _, outline_dict, presentation_title = cached
+    return copy.deepcopy(outline_dict), presentation_title
+
+def cache_outline(topic, detail_level, outline_dict, presentation_title):
+    """Remember a successfully generated outline in memory (evicting the oldest entry when full) and on disk"""
+    cache_key = (get_topic_signature(topic), detail_level)
+    _remember_outline(cache_key, copy.deepcopy(outline_dict), presentation_title, time.time())
+    write_cache_file(
+        get_outline_cache_file(cache_key),
+        json.dumps({"title": presentation_title, "outline": outline_dict}, ensure_ascii=False)
+    )
+
 
+def report_outline(outline_text, presentation_title, outline_dict, detail_level, source, verbose=False):
+    """
+    Print a slide count warning if needed, and with verbose the raw outline and its parsed structure.
+    The verbose report is written with a single print call.
+    """
+    if verbose:
+        lines = [
+            f"\n{source} {detail_level} outline:\n",
+            outline_text,
+            f"\nPresentation Title: {presentation_title}",
+            f"Parsed Outline Structure ({len(outline_dict)} slides):"
+        ]
+        lines.extend(f"• {section}: {len(points)} bullet points" for section, points in outline_dict.items())
+        print("\n".join(lines))
+    
+    # Validate slide count
+    slide_count = len(outline_dict)
+    if detail_level == "simple" and not (7 <= slide_count <= 12):
+        print(f"⚠️  Warning: Simple presentation has {slide_count} slides (expected 7-12)")
+    elif detail_level == "detailed" and not (10 <= slide_count <= 15):
+        print(f"⚠️  Warning: Detailed presentation has {slide_count} slides (expected 10-15)")
 
 
-def generate_outline(topic=None, detail_level=None):
-    """Main function to generate an outline with user preferences or provided arguments."""
+def generate_outline(topic=None, detail_level=None, verbose=False):
+    """
+    Main function to generate an outline with user preferences or provided arguments.
+    Set verbose to print the raw LLM output and the parsed structure.
+    """
     try:
         # Use provided arguments or get user preferences
         if not topic or not detail_level:
@@ -412,32 +821,35 @@ def generate_outline(topic=None, detail_level=None):
             # Extract clean topic from user input for the prompt
             topic = extract_topic_from_input(user_topic_input)
         
+        # Reuse the outline if this topic was already generated (e.g. step3 re-submitted)
+        use_cache = llm_cache_enabled()
+        cached = get_cached_outline(topic, detail_level) if use_cache else None
+        if cached:
+            print(f"♻️ Using cached {detail_level} outline for: {topic}")
+            return cached
+        
         # Initialize client and generate outline
         client = initialize_groq_client()
-        outline_text = get_presentation_outline(client, topic, detail_level)
         
-        print(f"\nGenerated {detail_level} outline:\n")
-        print(outline_text)
+        # Parse the response line by line while it streams in, keeping the chunks for the report
+        chunks = []
+        def collect_chunks():
+            # The outline cache above covers this request, so skip the raw response cache
+            for chunk in stream_presentation_outline(client, topic, detail_level, use_response_cache=False):
+                chunks.append(chunk)
+                yield chunk
         
-        # Parse to dictionary and extract title
-        presentation_title, outline_dict = parse_llm_output_to_outline(outline_text)
+        presentation_title, outline_dict = parse_outline_lines(iter_stream_lines(collect_chunks()))
+        outline_text = "".join(chunks)
         
         # If we couldn't extract a title, use the cleaned topic
         if not presentation_title:
             presentation_title = topic
         
-        print(f"\nPresentation Title: {presentation_title}")
-        print(f"Parsed Outline Structure ({len(outline_dict)} slides):")
-        for section, points in outline_dict.items():
-            print(f"• {section}: {len(points)} bullet points")
-        
-        # Validate slide count
-        slide_count = len(outline_dict)
-        if detail_level == "simple" and not (7 <= slide_count <= 12):
-            print(f"⚠️  Warning: Simple presentation has {slide_count} slides (expected 7-12)")
-        elif detail_level == "detailed" and not (10 <= slide_count <= 15):
-            print(f"⚠️  Warning: Detailed presentation has {slide_count} slides (expected 10-15)")
+        report_outline(outline_text, presentation_title, outline_dict, detail_level, "Generated", verbose)
         
+        if use_cache:
+            cache_outline(topic, detail_level, outline_dict, presentation_title)
         return outline_dict, presentation_title
         
     except Exception as e:
@@ -450,27 +862,66 @@ def generate_outline(topic=None, detail_level=None):
             topic = extract_topic_from_input(user_topic_input)
         
         outline_text = get_mock_outline(topic, detail_level)
-        presentation_title, outline_dict = parse_llm_output_to_outline(outline_text)
+        presentation_title, outline_dict = parse_llm_output_cached(outline_text)
         
         # If we couldn't extract a title, use the cleaned topic
         if not presentation_title:
             presentation_title = topic
         
-        print(f"\nMock {detail_level} outline:\n")
-        print(outline_text)
-        
-        print(f"\nPresentation Title: {presentation_title}")
-        print(f"Parsed Outline Structure ({len(outline_dict)} slides):")
-        for section, points in outline_dict.items():
-            print(f"• {section}: {len(points)} bullet points")
+        report_outline(outline_text, presentation_title, outline_dict, detail_level, "Mock", verbose)
         
         return outline_dict, presentation_title
 
 
+def generate_outlines(topics, detail_level="simple", verbose=False):
+    """
+    Generate outlines for several topics at once.
+    Each entry is a topic string (using detail_level) or a (topic, detail_level) pair.
+    Each topic goes through generate_outline (cache, Groq call, mock fallback) on a
+    worker thread, so the network round trips overlap instead of running back to back.
+    Returns a list of (outline_dict, presentation_title) in the same order as topics.
+    """
+    jobs = []
+    for entry in topics:
+        topic, level = (entry, detail_level) if isinstance(entry, str) else entry
+        if level not in VALID_DETAIL_LEVELS:
+            raise ValueError(f"❌ Unknown detail level: {level}")
+        jobs.append((topic.strip(), level))
+    
+    if not all(topic for topic, _ in jobs):
+        raise ValueError("❌ generate_outlines needs a non-empty topic for every entry.")
+    if not jobs:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=min(OUTLINE_BATCH_WORKERS, len(jobs))) as executor:
+        return list(executor.map(lambda job: generate_outline(job[0], job[1], verbose), jobs))
+
+
 if __name__ == "__main__":
-    # Test the LLM functionality
-    outline, presentation_title = generate_outline(args.topic, args.detail)
+    parser = argparse.ArgumentParser(description="Generate a presentation outline with Groq")
+    parser.add_argument("--topic", default=None, help="presentation topic (prompted for if omitted)")
+    parser.add_argument("--detail", choices=["simple", "detailed"], default=None, help="detail level (default: simple with --topic, otherwise prompted for)")
+    parser.add_argument("--batch-file", help="generate outlines for every topic in this file, one per line")
+    parser.add_argument("--clear-cache", action="store_true", help="delete cached Groq responses first")
+    parser.add_argument("--verbose", action="store_true", help="print the raw LLM output and parsed structure")
+    args = parser.parse_args()
     
-    # Show the parsed outline
-    print("\nFinal Parsed Outline:")
-    pprint.pprint(outline)
\ No newline at end of file
+    if args.clear_cache:
+        clear_cache()
+    
+    if args.batch_file:
+        with open(args.batch_file, encoding="utf-8") as f:
+            topics = [line.strip() for line in f if line.strip()]
+        
+        for outline, presentation_title in generate_outlines(topics, args.detail or "simple", args.verbose):
+            print(f"\nFinal Parsed Outline: {presentation_title}")
+            pprint.pprint(outline)
+    else:
+        # Test the LLM functionality
+        # A topic given on the command line defaults to simple instead of prompting again
+        detail_level = (args.detail or "simple") if args.topic else args.detail
+        outline, presentation_title = generate_outline(args.topic, detail_level, args.verbose)
+        
+        # Show the parsed outline
+        print("\nFinal Parsed Outline:")
+        pprint.pprint(outline)
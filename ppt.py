@@ -1,146 +1,29 @@
 import os
+import functools
 from dotenv import load_dotenv
-from groq import Groq
 import pprint
 import re
 import random
 import argparse
-import requests
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import MSO_AUTO_SIZE, MSO_ANCHOR, PP_ALIGN
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 import tempfile
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from llm_utils import generate_outline
+# Unsplash search, image download and query generation (shared session and search cache)
+from image_search import search_images, download_image, get_relevant_image_queries, IMAGE_SEARCH_WORKERS
 
 
 
 # Load environment variables
 load_dotenv()
-UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
 
+# Layouts that need an image
+IMAGE_LAYOUTS = ("image_left_text_right", "image_right_text_left", "image_full")
 
-def search_images(query, count=5):
-    """
-    Search for images using Unsplash API
-    """
-    if not UNSPLASH_ACCESS_KEY:
-        print("❌ Unsplash access key not found. Please add UNSPLASH_ACCESS_KEY to your .env file.")
-        return []
-    
-    try:
-        url = f"https://api.unsplash.com/search/photos"
-        params = {
-            "query": query,
-            "per_page": count,
-            "client_id": UNSPLASH_ACCESS_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        images = []
-        
-        for result in data.get("results", []):
-            images.append({
-                "id": result["id"],
-                "url": result["urls"]["regular"],
-                "description": result.get("description", result.get("alt_description", "")),
-                "download_url": result["urls"]["regular"]
-            })
-        
-        return images
-    
-    except Exception as e:
-        print(f"❌ Error searching images: {e}")
-        return []
-
-def download_image(image_url, filename):
-    """
-    Download an image from a URL
-    """
-    try:
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-        
-        with open(filename, 'wb') as f:
-            f.write(response.content)
-        
-        return True
-    except Exception as e:
-        print(f"❌ Error downloading image: {e}")
-        return False
-
-def get_relevant_image_queries(presentation_title, slide_title, content, is_detailed=False):
-    """
-    Generate relevant search queries for images based on presentation content
-    For detailed presentations, use the entire LLM content
-    """
-    queries = []
-    
-    if is_detailed:
-        # For detailed presentations, use the entire content from LLM
-        content_text = " ".join([point["text"] for point in content])
-        all_text = f"{presentation_title} {slide_title} {content_text}"
-        
-        # Extract meaningful words (nouns, adjectives)
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', all_text.lower())
-        
-        # Remove common stop words
-        stop_words = {"the", "and", "or", "but", "in", "on", "at", "to", "for", 
-                    "of", "with", "by", "that", "this", "these", "those", "is",
-                    "are", "was", "were", "be", "been", "being", "have", "has",
-                    "had", "do", "does", "did", "will", "would", "could", "should"}
-        
-        meaningful_words = [word for word in words if word not in stop_words]
-        
-        # Get the most frequent words
-        word_counts = Counter(meaningful_words)
-        most_common = [word for word, count in word_counts.most_common(8)]
-        
-        queries.extend(most_common)
-        
-        # Add combinations
-        for word in most_common[:3]:
-            queries.append(f"{presentation_title} {word}")
-            queries.append(f"{slide_title} {word}")
-    else:
-        # For simple presentations, use a more targeted approach
-        content_text = " ".join([point["text"] for point in content])
-        all_text = f"{slide_title} {content_text}"
-        
-        # Find specific nouns (more likely to have good images)
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', all_text.lower())
-        
-        # Filter out abstract terms
-        abstract_terms = {"management", "strategy", "system", "process", "method", 
-                         "approach", "concept", "theory", "principle", "framework",
-                         "model", "analysis", "development", "implementation"}
-        
-        concrete_words = [word for word in words if word not in abstract_terms]
-        
-        # Add the most frequent concrete words
-        word_counts = Counter(concrete_words)
-        most_common = [word for word, count in word_counts.most_common(5)]
-        
-        queries.extend(most_common)
-        
-        # Add combinations with presentation title for context
-        for word in most_common[:2]:
-            queries.append(f"{presentation_title} {word}")
-            queries.append(f"{slide_title} {word}")
-    
-    # Remove duplicates
-    queries = list(set(queries))
-    
-    # If we don't have good queries, fall back to slide title
-    if not queries or not any(q.strip() for q in queries):
-        queries = [slide_title]
-    
-    return queries
 
 def determine_slide_layout(slide_index, detail_level, content_length, outline, section_title):
     """
@@ -576,13 +459,21 @@ def create_thank_you_slide(prs):
     
     return slide
 
+@functools.lru_cache(maxsize=8)
+def _list_themes_cached(theme_folder, mtime):
+    """Directory listing of .pptx themes, cached per folder mtime"""
+    return tuple(f for f in os.listdir(theme_folder) if f.endswith(".pptx"))
+
 def list_available_themes(theme_folder="themes"):
     """List all available themes in the specified folder"""
-    if not os.path.exists(theme_folder):
+    try:
+        mtime = os.stat(theme_folder).st_mtime_ns
+    except FileNotFoundError:
         os.makedirs(theme_folder)
         return []
     
-    themes = [f for f in os.listdir(theme_folder) if f.endswith(".pptx")]
+    # Adding or removing a theme file changes the folder mtime, which refreshes the cache
+    themes = list(_list_themes_cached(theme_folder, mtime))
     return themes
 
 def get_theme_path(theme_name, theme_folder="themes"):
@@ -590,6 +481,23 @@ def get_theme_path(theme_name, theme_folder="themes"):
     return os.path.join(theme_folder, f"{theme_name}.pptx")
 
 
+def find_slide_image(presentation_title, section, points, detail_level, temp_dir):
+    """
+    Search for a relevant image for a slide and download the first hit.
+    Returns the downloaded image path, or None if no image was found.
+    """
+    queries = get_relevant_image_queries(presentation_title, section, points, detail_level == "detailed")
+    
+    for query in queries:
+        images = search_images(query, 3)
+        if images:
+            image_path = os.path.join(temp_dir, f"{section}_{images[0]['id']}.jpg")
+            if download_image(images[0]['download_url'], image_path):
+                return image_path
+    
+    return None
+
+
 def create_presentation(outline, presentation_title, detail_level, filename="presentation.pptx", theme_path=None):
     """
     Creates a PowerPoint presentation from a structured outline.
@@ -611,15 +519,31 @@ def create_presentation(outline, presentation_title, detail_level, filename="pre
         # Add the main title slide.
         create_title_slide(prs, presentation_title)
         
+        # Determine the correct layout for every slide up front so image searches can start together.
+        # The 'section' variable holds the slide title and is passed to the layout function.
+        outline_items = list(outline.items())
+        layouts = [
+            determine_slide_layout(i + 1, detail_level, len(points), outline, section)  # Offset by 1 for the title slide.
+            for i, (section, points) in enumerate(outline_items)
+        ]
+        
         # Create a temporary directory for downloaded images to avoid clutter.
         with tempfile.TemporaryDirectory() as temp_dir:
+            # Search and download images for all image slides in parallel (network-bound).
+            image_slides = [i for i, layout in enumerate(layouts) if layout in IMAGE_LAYOUTS]
+            image_paths = {}
+            if image_slides:
+                with ThreadPoolExecutor(max_workers=min(IMAGE_SEARCH_WORKERS, len(image_slides))) as executor:
+                    futures = {
+                        i: executor.submit(find_slide_image, presentation_title, *outline_items[i], detail_level, temp_dir)
+                        for i in image_slides
+                    }
+                image_paths = {i: future.result() for i, future in futures.items()}
+            
             # Iterate through the outline to create each slide.
-            for i, (section, points) in enumerate(outline.items()):
+            for i, (section, points) in enumerate(outline_items):
                 slide_index = i + 1  # Offset by 1 for the title slide.
-                
-                # Determine the correct layout for the current slide.
-                # The 'section' variable holds the slide title and is passed to the layout function.
-                layout = determine_slide_layout(slide_index, detail_level, len(points), outline, section)
+                layout = layouts[i]
                 
                 print(f"Creating slide {slide_index}: {section} ({layout} layout)")
                 
@@ -627,27 +551,17 @@ def create_presentation(outline, presentation_title, detail_level, filename="pre
                 if layout == "title_content":
                     create_title_content_slide(prs, section, points)
                 
-                elif layout in ["image_left_text_right", "image_right_text_left", "image_full"]:
-                    # Search for relevant images for the slide.
-                    queries = get_relevant_image_queries(presentation_title, section, points, detail_level == "detailed")
-                    image_found = False
-                    
-                    for query in queries:
-                        images = search_images(query, 3)
-                        if images:
-                            image_path = os.path.join(temp_dir, f"{section}_{images[0]['id']}.jpg")
-                            if download_image(images[0]['download_url'], image_path):
-                                image_found = True
-                                if layout == "image_left_text_right":
-                                    create_image_left_text_right_slide(prs, section, points, image_path)
-                                elif layout == "image_right_text_left":
-                                    create_image_right_text_left_slide(prs, section, points, image_path)
-                                elif layout == "image_full":
-                                    create_image_full_slide(prs, section, image_path)
-                                break
+                elif layout in IMAGE_LAYOUTS:
+                    image_path = image_paths.get(i)
                     
-                    # Fallback to a content-only slide if no image is found.
-                    if not image_found:
+                    if layout == "image_left_text_right" and image_path:
+                        create_image_left_text_right_slide(prs, section, points, image_path)
+                    elif layout == "image_right_text_left" and image_path:
+                        create_image_right_text_left_slide(prs, section, points, image_path)
+                    elif layout == "image_full" and image_path:
+                        create_image_full_slide(prs, section, image_path)
+                    else:
+                        # Fallback to a content-only slide if no image is found.
                         print(f"⚠️ No image found for '{section}', using title_content layout instead.")
                         create_title_content_slide(prs, section, points)
                 
@@ -672,7 +586,7 @@ def create_presentation(outline, presentation_title, detail_level, filename="pre
 
 def ensure_conclusion_slide(outline, presentation_title):
     """Ensure the presentation always ends with a conclusion slide"""
-    last_section = list(outline.keys())[-1] if outline else ""
+    last_section = next(reversed(outline)) if outline else ""
     
     # If the last slide isn't a conclusion, add one
     if not any(keyword in last_section.lower() for keyword in ["conclusion", "summary", "wrap-up", "final"]):